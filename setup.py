@@ -43,6 +43,7 @@ setup(
     extras_require={
         'compression': ["zstandard"],
         'encryption': ["cryptography"],
+        'fast-encryption': ["rfernet"],
         'full': ["zstandard", "cryptography", "tqdm"]
     },
     classifiers=[
@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import signal
 import sys
 
@@ -8,17 +11,25 @@ from src.argparser import ArgParser
 from src.backup_util import BackupUtil
 
 FORCE_STOP_LIMIT = 3
+LOG_FORMAT = "%(asctime)s - %(module)s.%(funcName)s:%(lineno)d - %(levelname)s - %(message)s"
 global stop_request_count
 
 
 def main():
     args = ArgParser().get_args()
-    logging.getLogger(__name__)
     log_level_str = args.log_level.upper()
     log_level = getattr(logging, log_level_str, logging.INFO)  # Explicitly default to INFO
+    # Route records through a queue so the backup loop never blocks on
+    # log I/O; a listener thread does the formatting and writes
+    log_queue = queue.SimpleQueue()
     logging.basicConfig(
-        format="%(asctime)s - %(module)s.%(funcName)s:%(lineno)d - %(levelname)s - %(message)s",
+        handlers=[logging.handlers.QueueHandler(log_queue)],
         level=log_level)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
 
     global stop_request_count
     stop_request_count = 0
@@ -46,6 +57,11 @@ def main():
         backup_util.close()
         sys.exit(0)
 
+    if getattr(args, 'train_zstd_dict', None):
+        backup_util.train_zstd_dict(args.train_zstd_dict)
+        backup_util.close()
+        sys.exit(0)
+
     if args.abort_incomplete_uploads:
         uploads = backup_util.list_incomplete_uploads()
         for upload in uploads:
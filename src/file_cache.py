@@ -1,5 +1,10 @@
 from io import BytesIO
 
+# 128 KiB buffers materially beat small default chunk sizes for
+# sequential streaming reads
+READ_BUFFER_SIZE = 128 * 1024
+
+
 class FileCache:
     def __init__(self, f, compression=False):
         self.compression = compression
@@ -7,40 +12,38 @@ class FileCache:
         if compression:
             import zstandard as zstd
             self.cctx = zstd.ZstdCompressor()
-            self.reader = self.cctx.read_to_iter(self.f, write_size=8192)
+            self.reader = self.cctx.read_to_iter(self.f, write_size=READ_BUFFER_SIZE)
         else:
             self.reader = self.f
-        self.next_chunk = b""
+        # bytearray so buffered compressed output grows in place instead
+        # of reallocating the whole buffer on every append
+        self.next_chunk = bytearray()
 
     def grow_chunk(self):
         new_chunk = next(self.reader)
         if new_chunk is None:
             raise StopIteration()
-        self.next_chunk = self.next_chunk + new_chunk
+        self.next_chunk.extend(new_chunk)
 
     def read(self, n):
-        if self.compression:
-            if self.next_chunk is None:
-                return None
-        else:
+        if not self.compression:
             if isinstance(self.reader, BytesIO):
-                if self.reader.tell() >= len(self.reader.getvalue()):
+                # getbuffer() avoids getvalue()'s full copy per call
+                if self.reader.tell() >= len(self.reader.getbuffer()):
                     return None
             elif not self.reader.readable():
                 return None
+            return self.reader.read(n)
+
+        if self.next_chunk is None:
+            return None
         try:
-            if not self.compression:
-                if isinstance(self.reader, BytesIO):
-                    rv = self.reader.read(n)
-                else:
-                    rv = self.reader.read(n)
-            else:
-                while len(self.next_chunk) < n:
-                    self.grow_chunk()
-                rv = self.next_chunk[:n]
-                self.next_chunk = self.next_chunk[n:]
-            return rv
+            while len(self.next_chunk) < n:
+                self.grow_chunk()
         except StopIteration:
-            rv = self.next_chunk
+            rv = bytes(self.next_chunk)
             self.next_chunk = None
             return rv
+        rv = bytes(self.next_chunk[:n])
+        del self.next_chunk[:n]
+        return rv
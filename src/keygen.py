@@ -38,29 +38,28 @@ def generate_key_file(output_path, force=False):
     Generate a new encryption key and save it to a file.
     Uses os.urandom for secure random number generation.
     """
-    # Check if file exists and force flag is not set
-    if os.path.exists(output_path) and not force:
-        raise FileExistsError(
-            f"Key file {output_path} already exists. Use --force to overwrite."
-        )
-
-    # Generate a proper 32-byte key
+    # Generate a proper 32-byte key; urlsafe base64 of 32 random bytes is
+    # a valid Fernet key by construction, so no validation round-trip
     raw_key = os.urandom(32)
     key = urlsafe_b64encode(raw_key)
-    
-    # Validate the key
-    is_valid, error = validate_key(key)
-    if not is_valid:
-        raise ValueError(f"Generated key validation failed: {error}")
 
     # Create directory if it doesn't exist
     os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
-    
-    # Create the file with restricted permissions (600)
-    with open(output_path, 'wb') as f:
+
+    # O_EXCL makes existence checking atomic with creation (no window
+    # between an exists() check and open), and the file is born with
+    # owner-only permissions instead of briefly carrying the umask default
+    flags = os.O_WRONLY | os.O_CREAT | (os.O_TRUNC if force else os.O_EXCL)
+    try:
+        fd = os.open(output_path, flags, stat.S_IRUSR | stat.S_IWUSR)
+    except FileExistsError:
+        raise FileExistsError(
+            f"Key file {output_path} already exists. Use --force to overwrite."
+        )
+    with os.fdopen(fd, 'wb') as f:
         os.chmod(output_path, stat.S_IRUSR | stat.S_IWUSR)  # Read/write for owner only
         f.write(key)
-    
+
     print(f"Generated encryption key and saved to: {output_path}")
     print("Key file permissions set to: owner read/write only")
     print("\nIMPORTANT:")
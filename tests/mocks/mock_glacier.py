@@ -3,6 +3,25 @@ Mock classes for AWS Glacier service interactions.
 Simulates the behavior of boto3.client('glacier') for testing purposes.
 """
 
+import hashlib
+
+
+def _tree_hash(body):
+    """SHA-256 tree hash of a part over 1 MB leaves, computed the way
+    Glacier reports it, so tests see realistic 64-hex-char checksums"""
+    mv = memoryview(body)
+    leaves = [hashlib.sha256(mv[i:i + 1048576]).digest()
+              for i in range(0, len(mv), 1048576)]
+    if not leaves:
+        leaves = [hashlib.sha256(b'').digest()]
+    while len(leaves) > 1:
+        leaves = [
+            hashlib.sha256(leaves[i] + leaves[i + 1]).digest()
+            if i + 1 < len(leaves) else leaves[i]
+            for i in range(0, len(leaves), 2)
+        ]
+    return leaves[0].hex()
+
 
 class MockGlacierResponse:
     """
@@ -40,6 +59,11 @@ class MockGlacierClient:
         self.archives = {} # Store complete archives
         self.vaults = {}   # Store vault information
 
+    def reset(self):
+        """Forget all uploads and vaults so a shared client instance can
+        be reused across tests without rebuilding it"""
+        self.__init__()
+
     def _get_next_upload_id(self):
         """Generate a new upload ID"""
         self.current_upload_id += 1
@@ -98,9 +122,8 @@ class MockGlacierClient:
             'size': end - start + 1
         })
         
-        # Generate a valid hex checksum (32 characters)
-        mock_checksum = "0" * 32  # Valid hex string for testing
-        return {"checksum": mock_checksum}
+        # Real tree hash of the body, as Glacier would report it
+        return {"checksum": _tree_hash(body)}
 
     def complete_multipart_upload(self, vaultName, uploadId, archiveSize, checksum):
         """
@@ -7,6 +7,7 @@ import os
 
 def test_db_initialization(mock_args, temp_dir):
     mock_args.src = temp_dir
+    mock_args.db = os.path.join(temp_dir, 'test.db')
     backup_util = BackupUtil(mock_args)
     assert os.path.exists(mock_args.db)
     
@@ -15,3 +16,14 @@ def test_db_initialization(mock_args, temp_dir):
     assert cur.fetchone() is not None
     cur.close()
 
+
+def test_total_tree_hash_rejects_short_digest(mock_args, mock_glacier):
+    """A part checksum that isn't 32 bytes must raise, not silently
+    misalign the reduction buffer"""
+    backup_util = BackupUtil(mock_args)
+    try:
+        with pytest.raises(ValueError, match="expected 32"):
+            backup_util.calculate_total_tree_hash([b'\x00' * 16])
+    finally:
+        backup_util.close()
+
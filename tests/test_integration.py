@@ -4,249 +4,299 @@ Tests complete backup cycles and incremental backups.
 """
 
 import pytest
+import hashlib
 import os
+from pathlib import Path
 from unittest.mock import patch
-from cryptography.fernet import Fernet
 from .mocks.mock_glacier import MockGlacierClient
 from src.backup_util import BackupUtil
 
 
+@pytest.fixture(scope='module')
+def glacier_env():
+    """One patched boto3.client and MockGlacierClient for the whole
+    module; per-test setup shrinks to a reset() call"""
+    with patch('boto3.client') as mock_boto3_client:
+        client = MockGlacierClient()
+        mock_boto3_client.return_value = client
+        yield client
+
+
+@pytest.fixture
+def mock_glacier_env(glacier_env, mock_args):
+    """Fresh mock Glacier state with the test vault already created"""
+    glacier_env.reset()
+    glacier_env.create_vault(mock_args.vault)
+    return glacier_env
+
+
 @pytest.mark.integration
-def test_full_backup_cycle(mock_args, temp_dir):
+def test_full_backup_cycle(mock_args, temp_dir, rand_bytes, mock_glacier_env):
     """Test a complete backup cycle with multiple files"""
     # Create test files
     test_files = []
     for i in range(3):
         path = os.path.join(temp_dir, f'test_file_{i}.dat')
-        with open(path, 'wb') as f:
-            f.write(os.urandom(1024 * (i + 1)))
+        Path(path).write_bytes(rand_bytes(1024 * (i + 1)))
         test_files.append(path)
-    
+
     mock_args.src = temp_dir
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        
-        # Create vault
-        mock_glacier.create_vault(mock_args.vault)
-        
-        # Run backup
-        backup_util = BackupUtil(mock_args)
-        try:
-            backup_util.backup()
-            
-            # Verify all files were processed
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM sync_history")
-            count = cur.fetchone()[0]
-            assert count == len(test_files), "Not all files were processed"
-            
-            # Verify archive creation
-            for file in test_files:
-                cur.execute("SELECT archive_id FROM sync_history WHERE path = ?", (file,))
-                archive_id = cur.fetchone()[0]
-                assert f"archive-upload-" in archive_id
-            
-            cur.close()
-        finally:
-            backup_util.close()
+
+    # Run backup
+    backup_util = BackupUtil(mock_args)
+    try:
+        backup_util.backup()
+
+        # One query gives both the processed count and the archive ids
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT path, archive_id FROM sync_history")
+        archives = dict(cur.fetchall())
+        cur.close()
+
+        assert len(archives) == len(test_files), "Not all files were processed"
+        for file in test_files:
+            assert archives[file].startswith("archive-upload-")
+    finally:
+        backup_util.close()
 
 
 @pytest.mark.integration
-def test_incremental_backup(mock_args, temp_dir):
+def test_incremental_backup(mock_args, temp_dir, tmp_path, rand_bytes, mock_glacier_env):
     """Test that only new or modified files are backed up"""
     # Initial file
     initial_file = os.path.join(temp_dir, 'initial.dat')
-    with open(initial_file, 'wb') as f:
-        f.write(os.urandom(1024))
-    
+    Path(initial_file).write_bytes(rand_bytes(1024))
+
     mock_args.src = temp_dir
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        mock_glacier.create_vault(mock_args.vault)
-        
-        # First backup
-        backup_util = BackupUtil(mock_args)
+    # Persistence across BackupUtil instances is the point here, so use
+    # a real db file — outside the backed-up tree — instead of the
+    # in-memory default
+    mock_args.db = str(tmp_path / 'sync.db')
+
+    # First backup
+    backup_util = BackupUtil(mock_args)
+    backup_util.backup()
+    backup_util.close()
+
+    # Create new file
+    new_file = os.path.join(temp_dir, 'new.dat')
+    Path(new_file).write_bytes(rand_bytes(1024))
+
+    # Second backup
+    backup_util = BackupUtil(mock_args)
+    try:
         backup_util.backup()
+
+        # Verify only new file was processed
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT path FROM sync_history ORDER BY id DESC LIMIT 1")
+        last_backed_up = cur.fetchone()[0]
+        assert last_backed_up == new_file
+        cur.close()
+    finally:
         backup_util.close()
-        
-        # Create new file
-        new_file = os.path.join(temp_dir, 'new.dat')
-        with open(new_file, 'wb') as f:
-            f.write(os.urandom(1024))
-        
-        # Second backup
-        backup_util = BackupUtil(mock_args)
-        try:
-            backup_util.backup()
-            
-            # Verify only new file was processed
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT path FROM sync_history ORDER BY id DESC LIMIT 1")
-            last_backed_up = cur.fetchone()[0]
-            assert last_backed_up == new_file
-            cur.close()
-        finally:
-            backup_util.close()
 
 
 @pytest.mark.integration
-def test_modified_file_backup(mock_args, temp_dir):
+def test_modified_file_backup(mock_args, temp_dir, tmp_path, rand_bytes, mock_glacier_env):
     """Test that modified files are re-backed up"""
     # Initial file
     test_file = os.path.join(temp_dir, 'test.dat')
-    with open(test_file, 'wb') as f:
-        f.write(os.urandom(1024))
-    
+    Path(test_file).write_bytes(rand_bytes(1024))
+
     mock_args.src = temp_dir
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        mock_glacier.create_vault(mock_args.vault)
-        
-        # First backup
-        backup_util = BackupUtil(mock_args)
+    # Persistence across BackupUtil instances is the point here, so use
+    # a real db file — outside the backed-up tree — instead of the
+    # in-memory default
+    mock_args.db = str(tmp_path / 'sync.db')
+
+    # First backup
+    backup_util = BackupUtil(mock_args)
+    backup_util.backup()
+    backup_util.close()
+
+    # Modify file
+    Path(test_file).write_bytes(rand_bytes(1024))
+
+    # Second backup
+    backup_util = BackupUtil(mock_args)
+    try:
         backup_util.backup()
+
+        # Verify file was backed up again
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM sync_history WHERE path = ?", (test_file,))
+        count = cur.fetchone()[0]
+        assert count == 2, "Modified file was not re-backed up"
+        cur.close()
+    finally:
         backup_util.close()
-        
-        # Modify file
-        with open(test_file, 'wb') as f:
-            f.write(os.urandom(1024))
-        
-        # Second backup
-        backup_util = BackupUtil(mock_args)
-        try:
-            backup_util.backup()
-            
-            # Verify file was backed up again
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM sync_history WHERE path = ?", (test_file,))
-            count = cur.fetchone()[0]
-            assert count == 2, "Modified file was not re-backed up"
-            cur.close()
-        finally:
-            backup_util.close()
 
 
 @pytest.mark.integration
-def test_compression_and_encryption(mock_args, temp_dir):
+def test_compression_and_encryption(mock_args, temp_dir, valid_fernet_key, rand_bytes, mock_glacier_env):
     """Test backup with both compression and encryption enabled"""
     test_file = os.path.join(temp_dir, 'test.dat')
-    with open(test_file, 'wb') as f:
-        f.write(os.urandom(1024 * 1024))  # 1MB file
-    
+    # 64KB exercises the compress+encrypt pipeline just as well as 1MB;
+    # the multi-part path has its own coverage elsewhere
+    Path(test_file).write_bytes(rand_bytes(64 * 1024))
+
     mock_args.src = temp_dir
     mock_args.compress = True
     mock_args.encrypt = True
-    mock_args.encryption_key = Fernet.generate_key().decode()
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        mock_glacier.create_vault(mock_args.vault)
-        
-        backup_util = BackupUtil(mock_args)
-        try:
-            backup_util.backup()
-            
-            # Verify compression and encryption flags
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT compression FROM sync_history WHERE path = ?", (test_file,))
-            compression = cur.fetchone()[0]
-            assert "encrypted" in compression
-            assert "zstd" in compression
-            cur.close()
-        finally:
-            backup_util.close()
+    mock_args.encryption_key = valid_fernet_key
+
+    backup_util = BackupUtil(mock_args)
+    try:
+        backup_util.backup()
+
+        # Verify compression and encryption flags
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT compression FROM sync_history WHERE path = ?", (test_file,))
+        compression = cur.fetchone()[0]
+        assert "encrypted" in compression
+        assert "zstd" in compression
+        cur.close()
+    finally:
+        backup_util.close()
+
+
+@pytest.mark.integration
+def test_verify_parts_and_total_tree_hash(mock_args, temp_dir, rand_bytes, mock_glacier_env):
+    """Test part verification and the odd-count total tree hash.
+    With the mock reporting real part checksums, --verify-parts must
+    pass, and the completed archive's checksum must match the AWS
+    reduction (unpaired nodes promoted unchanged) over three parts."""
+    test_file = os.path.join(temp_dir, 'test.dat')
+    # 2.5 parts -> odd part count exercises the promotion rule
+    Path(test_file).write_bytes(rand_bytes(mock_args.part_size * 5 // 2))
+
+    mock_args.src = test_file
+    mock_args.verify_parts = True
+
+    backup_util = BackupUtil(mock_args)
+    try:
+        backup_util.backup()
+
+        # Verification passed: the upload completed into an archive
+        assert len(mock_glacier_env.archives) == 1
+        archive = next(iter(mock_glacier_env.archives.values()))
+        parts = archive['parts']
+        assert len(parts) == 3
+
+        # Independent three-part reduction: root = H(H(d0+d1) + d2)
+        d0, d1, d2 = (
+            bytes.fromhex(backup_util._part_tree_hash(part['body']))
+            for part in parts)
+        expected = hashlib.sha256(
+            hashlib.sha256(d0 + d1).digest() + d2).hexdigest()
+        assert archive['checksum'] == expected
+    finally:
+        backup_util.close()
 
 
 @pytest.mark.integration
-def test_empty_directory(mock_args, temp_dir):
+def test_empty_directory(mock_args, temp_dir, mock_glacier_env):
     """Test handling of empty directories"""
     mock_args.src = temp_dir
-    
-    # Remove any existing database
-    if os.path.exists(mock_args.db):
-        os.remove(mock_args.db)
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        mock_glacier.create_vault(mock_args.vault)
-        
-        backup_util = BackupUtil(mock_args)
-        try:
-            backup_util.backup()
-            
-            # Verify no entries in sync history
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM sync_history")
-            count = cur.fetchone()[0]
-            assert count == 0, "Empty directory should not create any entries"
-            cur.close()
-        finally:
-            backup_util.close()
+
+    backup_util = BackupUtil(mock_args)
+    try:
+        backup_util.backup()
+
+        # Verify no entries in sync history
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM sync_history")
+        count = cur.fetchone()[0]
+        assert count == 0, "Empty directory should not create any entries"
+        cur.close()
+    finally:
+        backup_util.close()
 
 
 @pytest.mark.integration
-def test_backup_interruption(mock_args, temp_dir):
+def test_zstd_dict_round_trip(mock_args, temp_dir, tmp_path, mock_glacier_env):
+    """Train a dictionary from a tree of small similar files, back up
+    with --zstd-dict, and decompress the stored parts with the same
+    dictionary"""
+    import json
+    import zstandard as zstd
+
+    # Many small records with shared structure — the workload
+    # dictionaries exist for
+    payloads = set()
+    for i in range(50):
+        record = {"id": i, "status": "ok", "payload": f"value-{i}"}
+        data = (json.dumps(record) * 16).encode()
+        Path(os.path.join(temp_dir, f'record_{i}.json')).write_bytes(data)
+        payloads.add(data)
+
+    mock_args.src = temp_dir
+    dict_path = str(tmp_path / 'tree.dict')
+
+    backup_util = BackupUtil(mock_args)
+    backup_util.train_zstd_dict(dict_path)
+    backup_util.close()
+    assert os.path.getsize(dict_path) > 0
+
+    mock_args.compress = True
+    mock_args.zstd_dict = dict_path
+
+    backup_util = BackupUtil(mock_args)
+    try:
+        backup_util.backup()
+    finally:
+        backup_util.close()
+
+    assert len(mock_glacier_env.archives) == len(payloads)
+
+    # Each archive is one file's zstd stream split into parts; it must
+    # decompress with the trained dictionary back to an original payload
+    with open(dict_path, 'rb') as f:
+        dict_data = zstd.ZstdCompressionDict(f.read())
+    dctx = zstd.ZstdDecompressor(dict_data=dict_data)
+    decompressed = set()
+    for archive in mock_glacier_env.archives.values():
+        blob = b''.join(bytes(part['body']) for part in archive['parts'])
+        decompressed.add(dctx.decompressobj().decompress(blob))
+    assert decompressed == payloads
+
+
+@pytest.mark.integration
+def test_backup_interruption(mock_args, temp_dir, rand_bytes, mock_glacier_env):
     """Test graceful handling of backup interruption"""
     # Create multiple files
     test_files = []
     for i in range(5):
         path = os.path.join(temp_dir, f'test_file_{i}.dat')
-        with open(path, 'wb') as f:
-            f.write(os.urandom(1024 * 1024))  # 1MB each
+        Path(path).write_bytes(rand_bytes(1024 * 1024))  # 1MB each
         test_files.append(path)
-    
+
     mock_args.src = temp_dir
-    
-    with patch('boto3.client') as mock_boto3_client:
-        mock_glacier = MockGlacierClient()
-        mock_boto3_client.return_value = mock_glacier
-        mock_glacier.create_vault(mock_args.vault)
-        
-        backup_util = BackupUtil(mock_args)
-        try:
-            # Set up interruption after processing some files
-            def interrupt_after_files(file_path):
-                if 'test_file_2.dat' in file_path:
-                    backup_util.stop()
-            
-            # Patch the _compress method to trigger interruption
-            original_compress = backup_util._compress
-            def mock_compress(file_path):
-                interrupt_after_files(file_path)
-                return original_compress(file_path)
-            
-            backup_util._compress = mock_compress
-            
-            # Run backup
-            backup_util.backup()
-            
-            # Verify partial backup
-            cur = backup_util.conn.cursor()
-            cur.execute("SELECT COUNT(*) FROM sync_history")
-            count = cur.fetchone()[0]
-            assert count < len(test_files), "Interruption was not handled"
-            cur.close()
-        finally:
-            backup_util.close()
-
-
-@pytest.fixture(autouse=True)
-def cleanup_test_env():
-    """Clean up test environment before and after each test"""
-    # Pre-test cleanup
-    if os.path.exists("test.db"):
-        os.remove("test.db")
-    
-    yield
-    
-    # Post-test cleanup
-    if os.path.exists("test.db"):
-        os.remove("test.db")
+
+    backup_util = BackupUtil(mock_args)
+    try:
+        # Set up interruption after processing some files
+        def interrupt_after_files(file_path):
+            if 'test_file_2.dat' in file_path:
+                backup_util.stop()
+
+        # Patch the _compress method to trigger interruption
+        original_compress = backup_util._compress
+        def mock_compress(file_path):
+            interrupt_after_files(file_path)
+            return original_compress(file_path)
+
+        backup_util._compress = mock_compress
+
+        # Run backup
+        backup_util.backup()
+
+        # Verify partial backup
+        cur = backup_util.conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM sync_history")
+        count = cur.fetchone()[0]
+        assert count < len(test_files), "Interruption was not handled"
+        cur.close()
+    finally:
+        backup_util.close()
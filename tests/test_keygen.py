@@ -4,7 +4,11 @@ import pytest
 import os
 from src.keygen import generate_key_file, validate_key
 from cryptography.fernet import Fernet
-import stat
+from base64 import urlsafe_b64encode
+
+# Static valid key: any urlsafe base64 of 32 bytes is a well-formed
+# Fernet key, so validation tests don't need the CSPRNG
+VALID_KEY = urlsafe_b64encode(bytes(range(32)))
 
 
 def test_generate_key_file(tmp_path):
@@ -15,12 +19,8 @@ def test_generate_key_file(tmp_path):
     # Check file exists
     assert key_file.exists()
     
-    # Check file permissions (600)
-    mode = os.stat(key_file).st_mode
-    assert mode & stat.S_IRUSR  # Owner can read
-    assert mode & stat.S_IWUSR  # Owner can write
-    assert not mode & stat.S_IRWXG  # Group has no permissions
-    assert not mode & stat.S_IRWXO  # Others have no permissions
+    # Check file permissions (owner read/write only)
+    assert os.stat(key_file).st_mode & 0o777 == 0o600
     
     # Check key content is valid
     with open(key_file, 'rb') as f:
@@ -55,7 +55,7 @@ def test_key_validation():
     """Test key validation function"""
     test_cases = [
         # Valid cases
-        (Fernet.generate_key(), True),
+        (VALID_KEY, True),
         
         # Invalid cases
         (b"too-short", False),
@@ -137,22 +137,6 @@ def test_verify_existing_key(tmp_path):
     assert error is not None
 
 
-def test_key_file_permissions(tmp_path):
-    """Test key file has secure permissions"""
-    key_file = tmp_path / "test.key"
-    generate_key_file(str(key_file))
-    
-    # Get file permissions
-    mode = os.stat(key_file).st_mode
-    
-    # Check specific permissions
-    assert mode & stat.S_IRUSR  # Owner read
-    assert mode & stat.S_IWUSR  # Owner write
-    assert not mode & stat.S_IXUSR  # Owner not execute
-    assert not mode & stat.S_IRWXG  # No group permissions
-    assert not mode & stat.S_IRWXO  # No other permissions
-
-
 @pytest.mark.skipif(os.name == 'nt', reason="Permission tests don't apply to Windows")
 def test_key_file_security(tmp_path):
     """Test key file security attributes"""
@@ -166,9 +150,10 @@ def test_key_file_security(tmp_path):
 
 def test_multiple_keys(tmp_path):
     """Test generating multiple keys"""
-    # Generate multiple keys
+    # Three keys are enough to show uniqueness; each generation is a
+    # urandom draw plus file creation
     keys = []
-    for i in range(5):
+    for i in range(3):
         key_file = tmp_path / f"key_{i}.key"
         generate_key_file(str(key_file))
         with open(key_file, 'rb') as f: